@@ -10,6 +10,11 @@ load_dotenv()
 
 # Database
 DB_PATH = os.getenv("DB_PATH", "/data/users.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(os.cpu_count() or 4)))
+# Page cache is per pooled connection; the shared mmap does most of the work
+DB_CACHE_MB = int(os.getenv("DB_CACHE_MB", "64"))
+# Stock SQLite builds cap mmap at SQLITE_MAX_MMAP_SIZE (0x7fff0000, just under 2GB)
+DB_MMAP_MB = int(os.getenv("DB_MMAP_MB", "2047"))
 
 # API
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -17,9 +22,15 @@ API_PORT = int(os.getenv("API_PORT", "8000"))
 
 # Performance
 MAX_RESULTS = int(os.getenv("MAX_RESULTS", "25"))
-DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
-DB_RETRY_DELAY = float(os.getenv("DB_RETRY_DELAY", "0.5"))
 DEEP_SEARCH_DEPTH = int(os.getenv("DEEP_SEARCH_DEPTH", "3"))
 
+# Lookup cache — the DB is read-only, so the TTL only bounds staleness
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "2"))
+
 # CORS — comma-separated allowed origins
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+CORS_ORIGINS = frozenset(
+    o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()
+)
+CORS_ALLOW_ALL = "*" in CORS_ORIGINS
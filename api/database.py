@@ -2,168 +2,240 @@
 Async SQLite Database Manager
 Optimized for 1.78B row dataset with deep-link search.
 Only uses indexed mobile column for all queries.
+Serves reads from a pool of read-only WAL connections.
 """
 
 import asyncio
 import logging
-import sqlite3
-from functools import wraps
-from typing import Any
+import os
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator
 
 import aiosqlite
 
-from api.config import DB_PATH, DB_RETRY_ATTEMPTS, DB_RETRY_DELAY, MAX_RESULTS, DEEP_SEARCH_DEPTH
+from api.config import (
+    CACHE_SIZE,
+    CACHE_TTL,
+    DB_CACHE_MB,
+    DB_MMAP_MB,
+    DB_PATH,
+    DB_POOL_SIZE,
+    MAX_RESULTS,
+    DEEP_SEARCH_DEPTH,
+)
 
 logger = logging.getLogger(__name__)
 
+# Only the columns _build_profile reads, as a lightweight row type
+Row = namedtuple("Row", "mobile alt_mobile name fname email address circle")
+
+# Placeholder values that never make it into a profile
+_BAD = frozenset({"", "None", "N/A"})
+
+# Hot statements are kept as fixed strings so sqlite3's per-connection
+# statement cache (keyed on SQL text) skips the parse/prepare step.
+ROW_COUNT_SQL = "SELECT MAX(rowid) FROM users"
+
+# Walks alt_mobile links inside SQLite: every hop is an idx_mobile seek.
+# ?1 seed, ?2 last hop depth (0-based), ?3 rows read per mobile. Each mobile
+# only ever reads its first ?3 rows (rowid order, as a plain LIMIT lookup
+# would), both when expanding and in the final join, so fan-out stays bounded.
+# UNION keeps one frontier row per (mobile, depth), so the walk costs at most
+# mobiles x depth expansions; _visit_order() restores the BFS order after.
+DEEP_SEARCH_SQL = """
+WITH RECURSIVE hop(mobile, depth) AS (
+    VALUES (?1, 0)
+    UNION
+    SELECT substr(trim(u.alt_mobile), -10), h.depth + 1
+    FROM hop h
+    JOIN users u ON u.rowid IN (
+        SELECT rowid FROM users WHERE mobile = h.mobile ORDER BY rowid LIMIT ?3
+    )
+    WHERE h.depth < ?2
+      AND length(trim(u.alt_mobile)) >= 10
+      AND substr(trim(u.alt_mobile), -10, 1) IN ('6', '7', '8', '9')
+)
+SELECT u.mobile, u.alt_mobile, u.name, u.fname, u.email, u.address, u.circle
+FROM (SELECT DISTINCT mobile FROM hop) n
+JOIN users u ON u.rowid IN (
+    SELECT rowid FROM users WHERE mobile = n.mobile ORDER BY rowid LIMIT ?3
+)
+ORDER BY u.rowid
+"""
+
+
+def _row_factory(cursor, row: tuple) -> Row:
+    return Row._make(row)
+
+
+def _unique(values: list[str]) -> list[str]:
+    """Order-preserving dedup (in C via dict.fromkeys), minus placeholders."""
+    return [v for v in dict.fromkeys(values) if v not in _BAD]
+
 
-def retry_on_lock(func):
-    """Retry on sqlite3.OperationalError (database locked)."""
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        delay = DB_RETRY_DELAY
-        for attempt in range(1, DB_RETRY_ATTEMPTS + 1):
-            try:
-                return await func(*args, **kwargs)
-            except (sqlite3.OperationalError, aiosqlite.OperationalError) as e:
-                if "locked" in str(e).lower() or "busy" in str(e).lower():
-                    logger.warning(f"DB locked (attempt {attempt}), retrying in {delay}s...")
-                    await asyncio.sleep(delay)
-                    delay *= 2
-                else:
-                    raise
-        return await func(*args, **kwargs)
-    return wrapper
+def _visit_order(seed: str, rows: list[Row]) -> list[Row]:
+    """
+    Re-walk the fetched rows breadth-first from the seed, so they come out
+    in the order a level-by-level lookup would have visited each mobile.
+    """
+    by_mobile: dict[str, list[Row]] = {}
+    for row in rows:
+        by_mobile.setdefault(str(row.mobile), []).append(row)
+
+    ordered: list[Row] = []
+    visited = {seed}
+    level = [seed]
+    while level:
+        next_level = []
+        for mobile in level:
+            for row in by_mobile.get(mobile, ()):
+                ordered.append(row)
+                alt = str(row.alt_mobile).strip()[-10:]
+                if len(alt) == 10 and alt[0] in "6789" and alt not in visited:
+                    visited.add(alt)
+                    next_level.append(alt)
+        level = next_level
+    return ordered
 
 
 class DatabaseManager:
-    """Async SQLite manager with deep-link search."""
+    """Async SQLite manager with deep-link search over a read-only pool."""
 
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, pool_size: int = DB_POOL_SIZE):
         self.db_path = db_path
-        self._conn: aiosqlite.Connection | None = None
+        self.pool_size = max(1, pool_size)
+        self._pool: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._cache: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        # Effective mmap window; SQLite clamps requests to SQLITE_MAX_MMAP_SIZE
+        self.mmap_size = 0
+
+    async def _open(self) -> aiosqlite.Connection:
+        """Open one read-only connection with optimized settings."""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = await aiosqlite.connect(uri, uri=True, timeout=30)
+        try:
+            # journal_mode is a property of the file: a read-only connection
+            # cannot set it, so it is only checked in connect()
+            await conn.execute("PRAGMA synchronous=NORMAL;")
+            await conn.execute("PRAGMA wal_autocheckpoint=0;")
+            # Lock waits happen in SQLite's C busy handler, not in Python
+            await conn.execute("PRAGMA busy_timeout=30000;")
+            await conn.execute(f"PRAGMA cache_size=-{DB_CACHE_MB * 1024};")
+            await conn.execute(f"PRAGMA mmap_size={DB_MMAP_MB * 1024 ** 2};")
+            self.mmap_size = (await conn.execute_fetchall("PRAGMA mmap_size;"))[0][0]
+            await conn.execute("PRAGMA temp_store=MEMORY;")
+            await conn.execute("PRAGMA query_only=ON;")
+
+            # Prepare the hot statement once so the first real lookup hits the cache
+            await conn.execute_fetchall(DEEP_SEARCH_SQL, ("", 0, 0))
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
 
     async def connect(self):
-        """Open connection with optimized settings."""
-        logger.info(f"Connecting to database: {self.db_path}")
-        self._conn = await aiosqlite.connect(self.db_path, timeout=30)
-        self._conn.row_factory = aiosqlite.Row
-
-        await self._conn.execute("PRAGMA journal_mode=WAL;")
-        await self._conn.execute("PRAGMA busy_timeout=10000;")
-        await self._conn.execute("PRAGMA cache_size=-64000;")
-        await self._conn.execute("PRAGMA mmap_size=2147483648;")
-        await self._conn.execute("PRAGMA temp_store=MEMORY;")
-        await self._conn.execute("PRAGMA query_only=ON;")
-
-        logger.info("Database connected with WAL mode.")
+        """Open the read-only connection pool."""
+        logger.info("Connecting to database: %s (pool=%d)", self.db_path, self.pool_size)
+        # Open (and warm) all connections concurrently, one worker thread each.
+        # aiosqlite threads are non-daemon: on any failure close the ones that
+        # did open, or the process hangs at exit.
+        results = await asyncio.gather(
+            *(self._open() for _ in range(self.pool_size)), return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            for r in results:
+                if not isinstance(r, BaseException):
+                    await r.close()
+            raise errors[0]
+        self._pool = list(results)
+        self._idle = asyncio.Queue()
+        for conn in self._pool:
+            self._idle.put_nowait(conn)
+
+        # Only worth a warning when the clamp leaves part of the file unmapped
+        if self.mmap_size < min(DB_MMAP_MB * 1024 ** 2, self.get_db_size()):
+            logger.warning(
+                "DB_MMAP_MB=%d capped by SQLite (SQLITE_MAX_MMAP_SIZE): mmap_size is %dMB.",
+                DB_MMAP_MB,
+                self.mmap_size // 1024 ** 2,
+            )
+
+        async with self._acquire() as conn:
+            journal_mode = (await conn.execute_fetchall("PRAGMA journal_mode;"))[0][0]
+        if journal_mode.lower() != "wal":
+            logger.error(
+                "Database is in journal_mode=%s, not WAL: readers will block behind "
+                "writers. Stop the API and run: python -m api.maintenance wal",
+                journal_mode,
+            )
+        logger.info("Database connected (journal_mode=%s).", journal_mode)
 
     async def close(self):
-        if self._conn:
-            await self._conn.close()
-            self._conn = None
-
-    @property
-    def conn(self) -> aiosqlite.Connection:
-        if self._conn is None:
+        for conn in self._pool:
+            await conn.close()
+        self._pool.clear()
+        self._idle = None
+        self._cache.clear()
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow an idle pooled connection for the duration of one query."""
+        if self._idle is None:
             raise RuntimeError("Database not connected.")
-        return self._conn
-
-    @retry_on_lock
-    async def search_by_mobile(self, mobile: str) -> list[dict[str, Any]]:
-        """Exact match on indexed mobile column — O(log n)."""
-        query = "SELECT * FROM users WHERE mobile = ? LIMIT ?"
-        async with self.conn.execute(query, (mobile, MAX_RESULTS)) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            yield conn
+        finally:
+            idle.put_nowait(conn)
 
     async def deep_search(self, seed_mobile: str) -> dict[str, Any]:
         """
-        BFS deep-link: search mobile (indexed), extract alt_mobile,
-        search alt values in mobile column. Up to DEEP_SEARCH_DEPTH levels.
+        Deep-link search: follow alt_mobile chains from the seed up to
+        DEEP_SEARCH_DEPTH levels in one recursive CTE, then build the profile.
+        Profiles are kept in an LRU cache for CACHE_TTL seconds.
         """
-        visited: set[str] = set()
-        queue: list[str] = [seed_mobile]
-        all_rows: list[dict[str, Any]] = []
-        seen_keys: set[int] = set()
-
-        depth = 0
-        while queue and depth < DEEP_SEARCH_DEPTH:
-            next_queue: list[str] = []
-
-            for number in queue:
-                if number in visited:
-                    continue
-                visited.add(number)
-
-                rows = await self.search_by_mobile(number)
-
-                for row in rows:
-                    row_key = hash((
-                        row.get("mobile", ""),
-                        row.get("name", ""),
-                        row.get("fname", ""),
-                        row.get("address", ""),
-                    ))
-                    if row_key in seen_keys:
-                        continue
-                    seen_keys.add(row_key)
-                    all_rows.append(row)
-
-                    alt = str(row.get("alt_mobile", "")).strip()
-                    if alt and alt not in ("None", "N/A", ""):
-                        alt_digits = alt[-10:] if len(alt) > 10 else alt
-                        if (
-                            len(alt_digits) == 10
-                            and alt_digits[0] in "6789"
-                            and alt_digits not in visited
-                        ):
-                            next_queue.append(alt_digits)
-
-            queue = next_queue
-            depth += 1
-
-        return self._build_profile(seed_mobile, all_rows)
-
-    def _build_profile(self, seed: str, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        now = time.monotonic()
+        cached = self._cache.get(seed_mobile)
+        if cached and now - cached[0] < CACHE_TTL:
+            self._cache.move_to_end(seed_mobile)
+            return dict(cached[1])
+
+        params = (seed_mobile, DEEP_SEARCH_DEPTH - 1, MAX_RESULTS)
+        async with self._acquire() as conn:
+            async with conn.execute(DEEP_SEARCH_SQL, params) as cursor:
+                cursor.row_factory = _row_factory
+                rows = await cursor.fetchall()
+
+        profile = self._build_profile(seed_mobile, _visit_order(seed_mobile, rows))
+        if CACHE_SIZE > 0:
+            self._cache[seed_mobile] = (now, profile)
+            self._cache.move_to_end(seed_mobile)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return dict(profile)
+
+    def _build_profile(self, seed: str, rows: list[Row]) -> dict[str, Any]:
         """Consolidate rows into JSON profile."""
-        phones, addresses, names, fnames, emails, circles = [], [], [], [], [], []
-        seen_p, seen_a, seen_n, seen_fn, seen_e, seen_c = set(), set(), set(), set(), set(), set()
+        phones, names, fnames, emails, addresses, circles = [], [], [], [], [], []
 
         for row in rows:
-            mob = str(row.get("mobile", "")).strip()
-            alt = str(row.get("alt_mobile", "")).strip()
-            if mob and mob not in seen_p:
-                seen_p.add(mob)
-                phones.append(mob)
-            if alt and alt not in seen_p and alt not in ("None", "N/A"):
-                seen_p.add(alt)
-                phones.append(alt)
-
-            name = str(row.get("name", "")).strip()
-            if name and name not in seen_n and name != "None":
-                seen_n.add(name)
-                names.append(name)
-
-            fname = str(row.get("fname", "")).strip()
-            if fname and fname not in seen_fn and fname != "None":
-                seen_fn.add(fname)
-                fnames.append(fname)
-
-            email = str(row.get("email", "")).strip()
-            if email and email not in seen_e and email not in ("None", "N/A", ""):
-                seen_e.add(email)
-                emails.append(email)
-
-            addr = str(row.get("address", "")).strip()
-            if addr and addr not in seen_a and addr != "None":
-                seen_a.add(addr)
-                addresses.append(addr)
-
-            circle = str(row.get("circle", "")).strip()
-            if circle and circle not in seen_c and circle != "None":
-                seen_c.add(circle)
-                circles.append(circle)
+            phones.append(str(row.mobile).strip())
+            phones.append(str(row.alt_mobile).strip())
+            names.append(str(row.name).strip())
+            fnames.append(str(row.fname).strip())
+            emails.append(str(row.email).strip())
+            addresses.append(str(row.address).strip())
+            circles.append(str(row.circle).strip())
+
+        phones, names, fnames, emails, addresses, circles = (
+            _unique(col) for col in (phones, names, fnames, emails, addresses, circles)
+        )
 
         return {
             "query": seed,
@@ -178,20 +250,15 @@ class DatabaseManager:
             "regions": circles,
         }
 
-    @retry_on_lock
     async def get_row_count(self) -> int:
-        query = "SELECT MAX(rowid) FROM users"
-        async with self.conn.execute(query) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row and row[0] else 0
-
-    @retry_on_lock
-    async def get_db_size(self) -> int:
-        async with self.conn.execute("PRAGMA page_count") as c1:
-            page_count = (await c1.fetchone())[0]
-        async with self.conn.execute("PRAGMA page_size") as c2:
-            page_size = (await c2.fetchone())[0]
-        return page_count * page_size
+        async with self._acquire() as conn:
+            async with conn.execute(ROW_COUNT_SQL) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row and row[0] else 0
+
+    def get_db_size(self) -> int:
+        """Main database file size — one stat() instead of two PRAGMA round-trips."""
+        return os.stat(self.db_path).st_size
 
 
 db = DatabaseManager()
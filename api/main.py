@@ -3,25 +3,51 @@ Phantom OSINT DB API — FastAPI Server
 Public REST API for mobile number lookup against 1.78B record database.
 """
 
+import atexit
+import queue
 import re
 import time
 import logging
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
+import orjson
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from api.config import API_HOST, API_PORT, CORS_ORIGINS
+from api.config import (
+    API_HOST,
+    API_PORT,
+    CORS_ALLOW_ALL,
+    CORS_ORIGINS,
+    DB_CACHE_MB,
+    STATS_CACHE_TTL,
+)
 from api.database import db
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)-8s | %(message)s",
-)
+# Log records are queued and written by a background thread, so slow
+# stderr/disk writes never block the event loop.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+_console = logging.StreamHandler()
+_console.setFormatter(logging.Formatter("%(asctime)s | %(levelname)-8s | %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+_log_listener = QueueListener(_log_queue, _console)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 
+# ── Responses ──────────────────────────────────────────────────────
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (Rust encoder) instead of stdlib json."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
 # ── Lifespan ───────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -39,14 +65,15 @@ app = FastAPI(
     description="Public API for mobile number lookup — 1.78B records, deep-link search.",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
 
-# CORS
+# CORS — frozenset keeps per-request origin checks O(1)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
+    allow_origins=["*"] if CORS_ALLOW_ALL else CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET"],
     allow_headers=["*"],
@@ -54,37 +81,45 @@ app.add_middleware(
 
 
 # ── Helpers ────────────────────────────────────────────────────────
+_NON_DIGIT_RE = re.compile(r"\D")
+# Optional 91 / 0 / 091 prefix, then a 10-digit number starting 6-9
+_MOBILE_RE = re.compile(r"(?:91|0|091)?([6-9]\d{9})")
+
+
 def clean_mobile(raw: str) -> str | None:
     """Extract clean 10-digit Indian mobile from any format."""
-    digits = re.sub(r"[^\d]", "", raw)
-    if not digits:
-        return None
-    if len(digits) == 12 and digits.startswith("91"):
-        digits = digits[2:]
-    elif len(digits) == 11 and digits.startswith("0"):
-        digits = digits[1:]
-    elif len(digits) == 13 and digits.startswith("091"):
-        digits = digits[3:]
-    if len(digits) == 10 and digits[0] in "6789":
-        return digits
-    return None
+    m = _MOBILE_RE.fullmatch(_NON_DIGIT_RE.sub("", raw))
+    return m.group(1) if m else None
+
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
+
+def format_size(size_bytes: int) -> str:
+    """Human-readable size; unit picked from bit_length() instead of a divide loop."""
+    i = min(max(size_bytes.bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (i * 10)):.1f} {_SIZE_UNITS[i]}"
 
 
 # ── Endpoints ──────────────────────────────────────────────────────
 
+# Static payload — built once at import instead of on every call
+_ROOT_STATUS = {
+    "status": "online",
+    "name": "Phantom OSINT DB API",
+    "version": "1.0.0",
+    "records": "1.78B",
+    "endpoints": {
+        "lookup": "/api/lookup?number=9876543210",
+        "docs": "/docs",
+    },
+}
+
+
 @app.get("/")
 async def root():
     """API status."""
-    return {
-        "status": "online",
-        "name": "Phantom OSINT DB API",
-        "version": "1.0.0",
-        "records": "1.78B",
-        "endpoints": {
-            "lookup": "/api/lookup?number=9876543210",
-            "docs": "/docs",
-        },
-    }
+    return _ROOT_STATUS
 
 
 @app.get("/api/lookup")
@@ -114,37 +149,35 @@ async def lookup(number: str = Query(..., description="10-digit Indian mobile nu
 
     profile["response_time_ms"] = elapsed_ms
 
-    logger.info(f"[LOOKUP] {mobile} → {profile['total_records']} records in {elapsed_ms}ms")
+    logger.info("[LOOKUP] %s → %d records in %dms", mobile, profile["total_records"], elapsed_ms)
+
+    return FastJSONResponse(content=profile)
+
 
-    return JSONResponse(content=profile)
+_stats_cache: tuple[float, dict] | None = None
 
 
 @app.get("/api/stats")
 async def stats():
-    """Database statistics."""
-    row_count = await db.get_row_count()
-    db_size = await db.get_db_size()
-
-    units = ["B", "KB", "MB", "GB", "TB"]
-    size = float(db_size)
-    for unit in units:
-        if size < 1024:
-            size_str = f"{size:.1f} {unit}"
-            break
-        size /= 1024
-    else:
-        size_str = f"{size:.1f} PB"
-
-    return {
-        "total_records": row_count,
-        "database_size": size_str,
+    """Database statistics (cached for STATS_CACHE_TTL seconds)."""
+    global _stats_cache
+    now = time.monotonic()
+    if _stats_cache and now - _stats_cache[0] < STATS_CACHE_TTL:
+        return _stats_cache[1]
+
+    result = {
+        "total_records": await db.get_row_count(),
+        "database_size": format_size(db.get_db_size()),
         "engine": "SQLite WAL",
-        "cache": "64MB",
-        "mmap": "2GB",
+        "cache": f"{DB_CACHE_MB}MB",
+        "mmap": f"{db.mmap_size // 1024 ** 2}MB",
     }
+    _stats_cache = (now, result)
+    return result
 
 
 # ── Run ────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, reload=False)
+    # loop="auto" picks uvloop when installed (see requirements.txt)
+    uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, reload=False, loop="auto")
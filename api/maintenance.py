@@ -0,0 +1,81 @@
+"""
+Phantom OSINT DB API — Offline Maintenance
+One-off operations on the users database. Stop the API before running.
+
+    python -m api.maintenance wal
+    python -m api.maintenance page-size [--page-size 8192]
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+
+from api.config import DB_PATH
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)-8s | %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def enable_wal(conn: sqlite3.Connection):
+    """
+    Switch the file to WAL journaling. The API opens read-only connections,
+    which cannot change the journal mode themselves.
+    """
+    mode = conn.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+    if mode.lower() != "wal":
+        raise RuntimeError(f"Could not enable WAL, journal_mode is still {mode!r}")
+    logger.info("journal_mode=wal")
+
+
+def rebuild_page_size(conn: sqlite3.Connection, page_size: int = 8192):
+    """
+    Rebuild the file with a larger page size: more keys per B-tree node,
+    so idx_mobile is shallower. Needs free disk space about the DB size.
+    """
+    current = conn.execute("PRAGMA page_size;").fetchone()[0]
+    if current == page_size:
+        logger.info("Page size already %d, nothing to do.", page_size)
+        return
+
+    # page_size cannot change while in WAL mode; always switch back, since
+    # the API's read-only connections cannot re-enable WAL themselves
+    logger.info("Rebuilding with page_size %d → %d (VACUUM)...", current, page_size)
+    conn.execute("PRAGMA journal_mode=DELETE;")
+    try:
+        conn.execute(f"PRAGMA page_size={page_size};")
+        conn.execute("VACUUM;")
+    finally:
+        conn.execute("PRAGMA journal_mode=WAL;")
+
+
+COMMANDS = {
+    "wal": enable_wal,
+    "page-size": rebuild_page_size,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline maintenance for the users database.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    parser.add_argument("--page-size", type=int, default=8192, help="Target page size for page-size")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        t_start = time.perf_counter()
+        if args.command == "page-size":
+            rebuild_page_size(conn, args.page_size)
+        else:
+            COMMANDS[args.command](conn)
+        logger.info("%s done in %.1fs", args.command, time.perf_counter() - t_start)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()